@@ -1,43 +1,88 @@
 from datetime import datetime, timedelta, timezone
 from typing import Optional
+import json
+import types
 import jwt
+import jwt.api_jws
+import jwt.api_jwt
+import orjson
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-import os
-utc_now = datetime.now(timezone.utc)
+import hashlib
+import threading
+import time
 
-if os.path.exists('.env'):
-    from dotenv import load_dotenv
-    load_dotenv()
+from app.config import settings
 
 
 ALGORITHM = "HS256"
-SECRET_KEY = os.getenv("SECRET_KEY")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
+SECRET_KEY = settings().SECRET_KEY
+ACCESS_TOKEN_EXPIRE_MINUTES = settings().ACCESS_TOKEN_EXPIRE_MINUTES
+
+# Tokens only carry `sub` and `exp`, so skip validation of the other claims
+_JWT_ALGORITHMS = (ALGORITHM,)
+_JWT_OPTIONS = {
+    "verify_signature": True,
+    "verify_exp": True,
+    "verify_nbf": False,
+    "verify_iat": False,
+    "verify_aud": False,
+    "verify_iss": False,
+    "require": ["exp", "sub"],
+}
+
+_DEFAULT_TTL = timedelta(minutes=15)
+
+# PyJWT parses the token header and payload through its module-level `json`.
+# Point that at a copy of the stdlib module whose `loads` is orjson's C parser;
+# encoding keeps the stdlib `dumps` since PyJWT passes it separators/cls kwargs.
+_jwt_json = types.ModuleType("json")
+_jwt_json.__dict__.update(json.__dict__)
+_jwt_json.loads = orjson.loads
+jwt.api_jws.json = _jwt_json
+jwt.api_jwt.json = _jwt_json
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Cache of successfully decoded tokens: sha256(token) -> (username, exp timestamp)
+TOKEN_CACHE_MAXSIZE = 1024
+_token_cache = {}
+_token_cache_lock = threading.Lock()
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
-    if expires_delta:
-        expire = utc_now + expires_delta
-    else:
-        expire = utc_now + timedelta(minutes=15)
+    expire = datetime.now(timezone.utc) + (expires_delta or _DEFAULT_TTL)
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str = Depends(oauth2_scheme)):
+# Declared async so FastAPI awaits it on the event loop instead of dispatching
+# every request's auth check to the threadpool; it does no blocking I/O.
+async def verify_token(token: str = Depends(oauth2_scheme)):
+    token_key = hashlib.sha256(token.encode()).hexdigest()
+    cached = _token_cache.get(token_key)
+    if cached is not None:
+        username, exp = cached
+        if time.time() < exp:
+            return username
+        _token_cache.pop(token_key, None)
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=_JWT_ALGORITHMS, options=_JWT_OPTIONS)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
     except jwt.PyJWTError:
         raise credentials_exception
+    # Only successful decodes are cached, and never past the token's own expiry
+    exp = payload.get("exp")
+    if exp is not None:
+        with _token_cache_lock:
+            if len(_token_cache) >= TOKEN_CACHE_MAXSIZE:
+                _token_cache.pop(next(iter(_token_cache), None), None)
+            _token_cache[token_key] = (username, float(exp))
     return username
@@ -0,0 +1,21 @@
+from functools import cache
+from pathlib import Path
+from types import SimpleNamespace
+import os
+
+
+# Environment is read once per process and shared by auth.py and main.py
+@cache
+def settings():
+    if Path('.env').exists():
+        from dotenv import load_dotenv
+        load_dotenv()
+    return SimpleNamespace(
+        SECRET_KEY=os.getenv("SECRET_KEY"),
+        ACCESS_TOKEN_EXPIRE_MINUTES=int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES")),
+        API_USERNAME=os.getenv("API_USERNAME"),
+        API_PASSWORD=os.getenv("API_PASSWORD"),
+        AWS_ACCESS_KEY_ID=os.getenv('AWS_ACCESS_KEY_ID'),
+        AWS_SECRET_ACCESS_KEY=os.getenv('AWS_SECRET_ACCESS_KEY'),
+        AWS_DEFAULT_REGION=os.getenv('AWS_DEFAULT_REGION', 'eu-north-1'),
+    )
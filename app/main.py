@@ -1,21 +1,31 @@
 from fastapi import FastAPI, Depends, HTTPException, status, APIRouter
 from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.responses import ORJSONResponse
 from datetime import timedelta
 from mangum import Mangum
 from app.auth import create_access_token, verify_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.config import settings
 from typing import List, Dict
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 import aioboto3
-from boto3.dynamodb.types import TypeDeserializer
-import os
+from botocore.config import Config
+from boto3.dynamodb.types import TypeDeserializer, DYNAMODB_CONTEXT
+import asyncio
+import time
+import hashlib
+import hmac
+from functools import lru_cache
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-if os.path.exists('.env'):
-    from dotenv import load_dotenv
-    load_dotenv()
-    
-API_USERNAME = os.getenv("API_USERNAME")
-API_PASSWORD = os.getenv("API_PASSWORD")
+API_USERNAME = settings().API_USERNAME
+API_PASSWORD = settings().API_PASSWORD
+
+# SHA-256 digests of the expected credentials, compared in constant time at login
+def credential_digest(value):
+    return hashlib.sha256(value.encode()).digest()
+
+API_USERNAME_DIGEST = credential_digest(API_USERNAME) if API_USERNAME else None
+API_PASSWORD_DIGEST = credential_digest(API_PASSWORD) if API_PASSWORD else None
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 app = FastAPI(
@@ -42,21 +52,64 @@ app = FastAPI(
     license_info={
         "name": "MIT License",
         "url": "https://opensource.org/licenses/MIT",
-    },)
+    },
+    default_response_class=ORJSONResponse,)
 
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
 session = aioboto3.Session(
-    aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
-    region_name=os.getenv('AWS_DEFAULT_REGION', 'eu-north-1')
+    aws_access_key_id=settings().AWS_ACCESS_KEY_ID,
+    aws_secret_access_key=settings().AWS_SECRET_ACCESS_KEY,
+    region_name=settings().AWS_DEFAULT_REGION
+)
+
+# Shared DynamoDB client, opened once per process and reused by every route
+ddb_config = Config(
+    max_pool_connections=64,
+    retries={"max_attempts": 5, "mode": "adaptive"},
+    tcp_keepalive=True,
+    connect_timeout=2,
+    read_timeout=5,
 )
+
+# Opened at startup under uvicorn, or lazily on the first request under Mangum,
+# where a warm Lambda container keeps it for later invocations
+_ddb_client_lock = asyncio.Lock()
+
+async def dynamodb_client():
+    if getattr(app.state, 'ddb', None) is None:
+        async with _ddb_client_lock:
+            if getattr(app.state, 'ddb', None) is None:
+                app.state.ddb_context = session.client('dynamodb', config=ddb_config)
+                app.state.ddb = await app.state.ddb_context.__aenter__()
+    return app.state.ddb
+
+@app.on_event("startup")
+async def open_dynamodb_client():
+    await dynamodb_client()
+
+@app.on_event("shutdown")
+async def close_dynamodb_client():
+    if getattr(app.state, 'ddb', None) is not None:
+        await app.state.ddb_context.__aexit__(None, None, None)
+        app.state.ddb = None
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # Helper function to deserialize DynamoDB items
+_deserialize = TypeDeserializer().deserialize
+_create_decimal = DYNAMODB_CONTEXT.create_decimal
+
+# Our tables only hold S and N attributes: handle those inline, with the same
+# results as TypeDeserializer, and fall back to it for any other type.
+def deserialize_dynamodb_value(value):
+    if 'S' in value:
+        return value['S']
+    if 'N' in value:
+        return _create_decimal(value['N'])
+    return _deserialize(value)
+
 def deserialize_dynamodb_item_for_list(item):
-    deserializer = TypeDeserializer()
-    return {k: deserializer.deserialize(v) for k, v in item.items()}
+    return {k: deserialize_dynamodb_value(v) for k, v in item.items()}
 # def deserialize_dynamodb_item(item):
 #     """Convert DynamoDB item to a regular Python dictionary"""
 #     deserialized_item = {}
@@ -65,6 +118,96 @@ def deserialize_dynamodb_item_for_list(item):
 #         deserialized_item[key] = value[data_type]
 #     return deserialized_item
 
+# Helper function to read every page of a table scan (a single scan call stops at 1 MB)
+async def scan_all_items(client, table_name):
+    items = []
+    paginator = client.get_paginator('scan')
+    async for page in paginator.paginate(TableName=table_name):
+        items.extend(page.get('Items', []))
+    return items
+
+# Helper function to write items in BatchWriteItem chunks of 25, retrying unprocessed items
+BATCH_WRITE_SIZE = 25
+BATCH_WRITE_MAX_RETRIES = 5
+
+async def batch_put_items(client, table_name, items):
+    for start in range(0, len(items), BATCH_WRITE_SIZE):
+        request_items = {table_name: [{'PutRequest': {'Item': item}} for item in items[start:start + BATCH_WRITE_SIZE]]}
+        for attempt in range(BATCH_WRITE_MAX_RETRIES + 1):
+            response = await client.batch_write_item(RequestItems=request_items)
+            request_items = response.get('UnprocessedItems', {})
+            if not request_items:
+                break
+            if attempt < BATCH_WRITE_MAX_RETRIES:
+                await asyncio.sleep(0.05 * 2 ** attempt)
+        else:
+            unprocessed = len(request_items.get(table_name, []))
+            raise RuntimeError(f"{unprocessed} items could not be written to {table_name}")
+
+# In-process read cache for single-item GETs: (table, key values...) -> (item, expires_at)
+READ_CACHE_MAXSIZE = 4096
+READ_CACHE_TTL = 30
+_read_cache = {}
+# Bumped on every invalidation so a read that was in flight at the time doesn't store
+# the item it fetched before the write. The per-key counters are reset when they
+# outgrow the cache, and _read_cache_epoch is bumped so in-flight reads still see it.
+_read_cache_epoch = 0
+_table_generations = {}
+_key_generations = {}
+
+def read_cache_key(table_name, key):
+    return (table_name,) + tuple(v['S'] for v in key.values())
+
+def read_cache_generation(cache_key):
+    return (_read_cache_epoch, _table_generations.get(cache_key[0], 0), _key_generations.get(cache_key, 0))
+
+async def get_item_cached(client, table_name, key):
+    cache_key = read_cache_key(table_name, key)
+    cached = _read_cache.get(cache_key)
+    if cached is not None:
+        item, expires_at = cached
+        if time.monotonic() < expires_at:
+            return item
+        _read_cache.pop(cache_key, None)
+    generation = read_cache_generation(cache_key)
+    response = await client.get_item(TableName=table_name, Key=key)
+    item = response.get('Item', None)
+    if not item:
+        return {}
+    item = deserialize_dynamodb_item_for_list(item)
+    if read_cache_generation(cache_key) == generation:
+        if len(_read_cache) >= READ_CACHE_MAXSIZE:
+            _read_cache.pop(next(iter(_read_cache), None), None)
+        _read_cache[cache_key] = (item, time.monotonic() + READ_CACHE_TTL)
+    return item
+
+def invalidate_cached_item(table_name, key):
+    global _read_cache_epoch
+    cache_key = read_cache_key(table_name, key)
+    if cache_key not in _key_generations and len(_key_generations) >= READ_CACHE_MAXSIZE:
+        _key_generations.clear()
+        _read_cache_epoch += 1
+    _key_generations[cache_key] = _key_generations.get(cache_key, 0) + 1
+    _read_cache.pop(cache_key, None)
+
+# Shift creates write staffID/startDate, not the shiftID/startDate key that
+# get_shift caches on, so they drop the whole table's entries
+def invalidate_cached_table(table_name):
+    _table_generations[table_name] = _table_generations.get(table_name, 0) + 1
+    for cache_key in [k for k in _read_cache if k[0] == table_name]:
+        del _read_cache[cache_key]
+
+# Helper function to build an UpdateExpression, cached per set of updated fields
+@lru_cache(maxsize=256)
+def build_update_expression(keys):
+    return "SET " + ", ".join(f"{k} = :{k}" for k in keys)
+
+# Helper function to build the UpdateExpression and typed ExpressionAttributeValues for an update
+def prepare_update(updates, attr_types):
+    update_expression = build_update_expression(tuple(updates))
+    expression_attribute_values = {f":{k}": {attr_types.get(k, 'S'): v} for k, v in updates.items()}
+    return update_expression, expression_attribute_values
+
 # Helper function for deserializing DynamoDB items - Update Route
 def deserialize_dynamodb_item(item):
     if 'S' in item:
@@ -106,6 +249,29 @@ class Expense(BaseModel):
     pettyCash: float
     general: float
     
+# DynamoDB attribute type of each model field, resolved once at import
+def dynamodb_attribute_types(model):
+    return {name: 'N' if field.annotation in (int, float) else 'S' for name, field in model.model_fields.items()}
+
+STAFF_ATTR_TYPES = dynamodb_attribute_types(Staff)
+SHIFT_ATTR_TYPES = dynamodb_attribute_types(Shift)
+EXPENSE_ATTR_TYPES = dynamodb_attribute_types(Expense)
+
+# Generate a model -> DynamoDB item function at import, with one attribute access per field
+def make_item_serializer(model):
+    fields = []
+    for name, attr_type in dynamodb_attribute_types(model).items():
+        value = f"str(obj.{name})" if attr_type == 'N' else f"obj.{name}"
+        fields.append(f"{name!r}: {{{attr_type!r}: {value}}}")
+    source = f"def to_item(obj):\n    return {{{', '.join(fields)}}}\n"
+    namespace = {}
+    exec(source, namespace)
+    return namespace['to_item']
+
+staff_to_item = make_item_serializer(Staff)
+shift_to_item = make_item_serializer(Shift)
+expense_to_item = make_item_serializer(Expense)
+
 class UpdateStaffRequest(BaseModel):
     updates: Dict[str, str]
     
@@ -123,7 +289,9 @@ async def root():
 @app.post("/token", response_model=Token, tags=["Login"])
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     
-    if form_data.username != API_USERNAME or form_data.password != API_PASSWORD:
+    username_ok = hmac.compare_digest(credential_digest(form_data.username), API_USERNAME_DIGEST or b"")
+    password_ok = hmac.compare_digest(credential_digest(form_data.password), API_PASSWORD_DIGEST or b"")
+    if not (username_ok & password_ok):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
@@ -140,15 +308,9 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
 @app.post("/jta/api/staff", tags=["Create Staff"])
 async def create_staff(staff: Staff, token: str = Depends(verify_token)):
     try:
-        async with session.client('dynamodb') as client:
-            item = {
-                'staffID': {'S': staff.staffID},
-                'fullName': {'S': staff.fullName},
-                'employmentType': {'S': staff.employmentType},
-                'jobTitle': {'S': staff.jobTitle},
-                'hourlyRate': {'N': str(staff.hourlyRate)}
-            }
-            await client.put_item(TableName='Staff', Item=item)
+        client = await dynamodb_client()
+        await client.put_item(TableName='Staff', Item=staff_to_item(staff))
+        invalidate_cached_item('Staff', {'staffID': {'S': staff.staffID}})
         return {"message": "Staff created successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -156,11 +318,9 @@ async def create_staff(staff: Staff, token: str = Depends(verify_token)):
 @app.get("/jta/api/staff", response_model=List[dict], tags=["List all staffs"])
 async def get_all_staff(token: str = Depends(verify_token)):
     try:
-        async with session.client('dynamodb') as client:
-            response = await client.scan(TableName='Staff')
-            items = response.get('Items', [])
-            deserialized_items = [deserialize_dynamodb_item_for_list(item) for item in items]
-            return deserialized_items if deserialized_items else []
+        client = await dynamodb_client()
+        items = await scan_all_items(client, 'Staff')
+        return [deserialize_dynamodb_item_for_list(item) for item in items]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -170,10 +330,8 @@ async def get_all_staff(token: str = Depends(verify_token)):
 @app.get("/jta/api/staff/{staff_id}", response_model=dict, tags=["Gets a staff"])
 async def get_staff(staff_id: str, token: str = Depends(verify_token)):
     try:
-        async with session.client('dynamodb') as client:
-            response = await client.get_item(TableName='Staff', Key={'staffID': {'S': staff_id}})
-            item = response.get('Item', None)
-            return deserialize_dynamodb_item(item) if item else {}
+        client = await dynamodb_client()
+        return await get_item_cached(client, 'Staff', {'staffID': {'S': staff_id}})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))  
 # -----------------------------------------------------------------------------------------------------------
@@ -185,16 +343,10 @@ async def update_staff(staff_id: str, request: UpdateStaffRequest, token: str =
         if not isinstance(updates, dict):
             raise ValueError("Updates should be provided as a dictionary")
         
-        # Construct the update expression
-        update_expression = "SET " + ", ".join(f"{k} = :{k}" for k in updates.keys())
-        expression_attribute_values = {f":{k}": v for k, v in updates.items()}
-        
         # Get the DynamoDB table client
-        async with session.client('dynamodb') as client:
-            update_expression = "SET " + ", ".join(f"{k} = :{k}" for k in updates.keys())
-            expression_attribute_values = {f":{k}": {'S': v} if isinstance(v, str) else {'N': str(v)} for k, v in updates.items()}
-        
-        # Get the DynamoDB table client,
+        client = await dynamodb_client()
+        # Construct the update expression
+        update_expression, expression_attribute_values = prepare_update(updates, STAFF_ATTR_TYPES)
         
         # Update the item in the table
         response = await client.update_item(
@@ -204,6 +356,7 @@ async def update_staff(staff_id: str, request: UpdateStaffRequest, token: str =
             ExpressionAttributeValues=expression_attribute_values,
             ReturnValues="UPDATED_NEW"
         )
+        invalidate_cached_item('Staff', {'staffID': {'S': staff_id}})
         
         # Get the updated attributes
         attributes = response.get('Attributes', None)
@@ -218,8 +371,9 @@ async def update_staff(staff_id: str, request: UpdateStaffRequest, token: str =
 @app.delete("/jta/api/staff/{staff_id}", response_model=dict, tags=["Deletes a staff"])
 async def delete_staff(staff_id: str, token: str = Depends(verify_token)):
     try:
-        async with session.client('dynamodb') as client:
-            await client.delete_item(TableName='Staff', Key={'staffID': {'S': staff_id}})
+        client = await dynamodb_client()
+        await client.delete_item(TableName='Staff', Key={'staffID': {'S': staff_id}})
+        invalidate_cached_item('Staff', {'staffID': {'S': staff_id}})
         return {"message": "Staff deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -230,53 +384,46 @@ async def delete_staff(staff_id: str, token: str = Depends(verify_token)):
 @app.get("/jta/api/shifts", response_model=List[dict], tags=["Lists all shifts"])
 async def get_all_shifts(token: str = Depends(verify_token)):
     try:
-        async with session.client('dynamodb') as client:
-            response = await client.scan(TableName='Shifts')
-            items = response.get('Items', [])
-            deserialized_items = [deserialize_dynamodb_item_for_list(item) for item in items]
-            return deserialized_items if deserialized_items else []
+        client = await dynamodb_client()
+        items = await scan_all_items(client, 'Shifts')
+        return [deserialize_dynamodb_item_for_list(item) for item in items]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # -----------------------------------------------------------------------------------------------------------
 
 @app.get("/jta/api/shifts/{shift_id}/{start_date}", response_model=dict, tags=["Gets a shift for a particular date"])
-async def get_shift(staff_id: str, start_date: str, token: str = Depends(verify_token)):
+async def get_shift(shift_id: str, start_date: str, token: str = Depends(verify_token)):
     try:
-        async with session.client('dynamodb') as client:
-            response = await client.get_item(TableName='Shifts', Key={'shiftID': {'S': 'shift_id'}, 'startDate': {'S': start_date}})
-            item = response.get('Item', None)
-            return deserialize_dynamodb_item(item) if item else {}
+        client = await dynamodb_client()
+        return await get_item_cached(client, 'Shifts', {'shiftID': {'S': shift_id}, 'startDate': {'S': start_date}})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # -----------------------------------------------------------------------------------------------------------
 
 @app.put("/jta/api/shifts/{shift_id}/{start_date}", response_model=dict, tags=["Updates a shift for a particular date"] )
-async def update_shift(staff_id: str, start_date: str, request: UpdateStaffRequest, token: str = Depends(verify_token)):
+async def update_shift(shift_id: str, start_date: str, request: UpdateStaffRequest, token: str = Depends(verify_token)):
     try:
         updates = request.updates  # Access the updates attribute from the request
         # Ensure the input is a dictionary
         if not isinstance(updates, dict):
             raise ValueError("Updates should be provided as a dictionary")
         
-        # Construct the update expression
-        update_expression = "SET " + ", ".join(f"{k} = :{k}" for k in updates.keys())
-        expression_attribute_values = {f":{k}": v for k, v in updates.items()}
-        
         # Get the DynamoDB table client
-        async with session.client('dynamodb') as client:
-            update_expression = "SET " + ", ".join(f"{k} = :{k}" for k in updates.keys())
-            expression_attribute_values = {f":{k}": {'S': v} if isinstance(v, str) else {'N': str(v)} for k, v in updates.items()}
-            response = await client.update_item(
-                TableName='Shifts',
-                Key={'shiftID': {'S': 'shift_id'}, 'startDate': {'S': start_date}},
-                UpdateExpression=update_expression,
-                ExpressionAttributeValues=expression_attribute_values,
-                ReturnValues="UPDATED_NEW"
-            )
-            attributes = response.get('Attributes', None)
-            return {k: deserialize_dynamodb_item(v) for k, v in attributes.items()} if attributes else {}
+        client = await dynamodb_client()
+        # Construct the update expression
+        update_expression, expression_attribute_values = prepare_update(updates, SHIFT_ATTR_TYPES)
+        response = await client.update_item(
+            TableName='Shifts',
+            Key={'shiftID': {'S': shift_id}, 'startDate': {'S': start_date}},
+            UpdateExpression=update_expression,
+            ExpressionAttributeValues=expression_attribute_values,
+            ReturnValues="UPDATED_NEW"
+        )
+        invalidate_cached_item('Shifts', {'shiftID': {'S': shift_id}, 'startDate': {'S': start_date}})
+        attributes = response.get('Attributes', None)
+        return {k: deserialize_dynamodb_item(v) for k, v in attributes.items()} if attributes else {}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -285,33 +432,36 @@ async def update_shift(staff_id: str, start_date: str, request: UpdateStaffReque
 @app.post("/jta/api/shifts", tags=["Create Shift"])
 async def create_shift(shift: Shift, token: str = Depends(verify_token)):
     try:
-        async with session.client('dynamodb') as client:
-            item = {
-                'staffID': {'S': shift.staffID},
-                'startDate': {'S': shift.startDate},
-                'endDate': {'S': shift.endDate},
-                'house': {'S': shift.house},
-                'shift': {'S': shift.shift},
-                'shiftStart': {'S': shift.shiftStart},
-                'shiftEnd': {'S': shift.shiftEnd},
-                'overtime': {'N': str(shift.overtime)},
-                'totalHours': {'N': str(shift.totalHours)},
-                'totalWage': {'N': str(shift.totalWage)},
-                'absence': {'S': str(shift.absence)},
-                'absenceStatus': {'S': str(shift.absenceStatus)}
-                }
-        await client.put_item(TableName='Shifts', Item=item)
+        client = await dynamodb_client()
+        await client.put_item(TableName='Shifts', Item=shift_to_item(shift))
+        invalidate_cached_table('Shifts')
         return {"message": "Shift created successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # -----------------------------------------------------------------------------------------------------------
 
+@app.post("/jta/api/shifts/batch", tags=["Create Shifts in bulk"])
+async def create_shifts_batch(shifts: List[Shift], token: str = Depends(verify_token)):
+    try:
+        client = await dynamodb_client()
+        # Earlier chunks may already be written if a later one fails
+        try:
+            await batch_put_items(client, 'Shifts', [shift_to_item(shift) for shift in shifts])
+        finally:
+            invalidate_cached_table('Shifts')
+        return {"message": f"{len(shifts)} shifts created successfully"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# -----------------------------------------------------------------------------------------------------------
+
 @app.delete("/jta/api/shifts/{shift_id}/{start_date}", response_model=dict, tags=["Deletes a shift for a particular date"])
-async def delete_shift(staff_id: str, start_date: str, token: str = Depends(verify_token)):
+async def delete_shift(shift_id: str, start_date: str, token: str = Depends(verify_token)):
     try:
-        async with session.client('dynamodb') as client:
-            await client.delete_item(TableName='Shifts', Key={'shiftID': {'S': 'shift_id'}, 'startDate': {'S': start_date}})
+        client = await dynamodb_client()
+        await client.delete_item(TableName='Shifts', Key={'shiftID': {'S': shift_id}, 'startDate': {'S': start_date}})
+        invalidate_cached_item('Shifts', {'shiftID': {'S': shift_id}, 'startDate': {'S': start_date}})
         return {"message": "Shift deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -322,31 +472,35 @@ async def delete_shift(staff_id: str, start_date: str, token: str = Depends(veri
 @app.post("/jta/api/expense", tags=["Create expense"])
 async def create_expense(expense: Expense, token: str = Depends(verify_token)):
     try:
-        async with session.client('dynamodb') as client:
-            item = {
-        'expenseID': {'S': expense.expenseID},
-        'date': {'S': expense.date},
-        'youngPersonWeeklyMoney': {'N': str(expense.youngPersonWeeklyMoney)},
-        'maintenance': {'N': str(expense.maintenance)},
-        'IT': {'N': str(expense.IT)},
-        'misc': {'N': str(expense.misc)},
-        'pettyCash': {'N': str(expense.pettyCash)},
-        'general': {'N': str(expense.general)}
-    }
-            await client.put_item(TableName='Expenses', Item=item)
+        client = await dynamodb_client()
+        await client.put_item(TableName='Expenses', Item=expense_to_item(expense))
+        invalidate_cached_item('Expenses', {'expenseID': {'S': expense.expenseID}, 'date': {'S': expense.date}})
         return {"message": "Expense created successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 # -----------------------------------------------------------------------------------------------------------
 
+@app.post("/jta/api/expenses/batch", tags=["Create expenses in bulk"])
+async def create_expenses_batch(expenses: List[Expense], token: str = Depends(verify_token)):
+    try:
+        client = await dynamodb_client()
+        # Earlier chunks may already be written if a later one fails
+        try:
+            await batch_put_items(client, 'Expenses', [expense_to_item(expense) for expense in expenses])
+        finally:
+            for expense in expenses:
+                invalidate_cached_item('Expenses', {'expenseID': {'S': expense.expenseID}, 'date': {'S': expense.date}})
+        return {"message": f"{len(expenses)} expenses created successfully"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+# -----------------------------------------------------------------------------------------------------------
+
 @app.get("/jta/api/expenses", response_model=List[dict], tags=["List all expenses"])
 async def get_all_expenses(token: str = Depends(verify_token)):
     try:
-        async with session.client('dynamodb') as client:
-            response = await client.scan(TableName='Expenses')
-            items = response.get('Items', [])
-            deserialized_items = [deserialize_dynamodb_item_for_list(item) for item in items]
-            return deserialized_items if deserialized_items else []
+        client = await dynamodb_client()
+        items = await scan_all_items(client, 'Expenses')
+        return [deserialize_dynamodb_item_for_list(item) for item in items]
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 # -----------------------------------------------------------------------------------------------------------
@@ -354,10 +508,8 @@ async def get_all_expenses(token: str = Depends(verify_token)):
 @app.get("/jta/api/expense/{expense_id}/{date}", response_model=dict, tags=["Get expense by date and ID"])
 async def get_expense(expense_id: str, date: str, token: str = Depends(verify_token)):
     try:
-        async with session.client('dynamodb') as client:
-            response = await client.get_item(TableName='Expenses', Key={'expenseID': {'S': expense_id}, 'date': {'S': date}})
-            item = response.get('Item', None)
-            return deserialize_dynamodb_item(item) if item else {}
+        client = await dynamodb_client()
+        return await get_item_cached(client, 'Expenses', {'expenseID': {'S': expense_id}, 'date': {'S': date}})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -371,23 +523,20 @@ async def update_expense(expense_id: str, date: str, request: UpdateStaffRequest
         if not isinstance(updates, dict):
             raise ValueError("Updates should be provided as a dictionary")
         
-        # Construct the update expression
-        update_expression = "SET " + ", ".join(f"{k} = :{k}" for k in updates.keys())
-        expression_attribute_values = {f":{k}": v for k, v in updates.items()}
-        
         # Get the DynamoDB table client
-        async with session.client('dynamodb') as client:
-            update_expression = "SET " + ", ".join(f"{k} = :{k}" for k in updates.keys())
-            expression_attribute_values = {f":{k}": {'S': v} if isinstance(v, str) else {'N': str(v)} for k, v in updates.items()}
-            response = await client.update_item(
-                TableName='Expenses',
-                Key={'expenseID': {'S': expense_id}, 'date': {'S': date}},
-                UpdateExpression=update_expression,
-                ExpressionAttributeValues=expression_attribute_values,
-                ReturnValues="UPDATED_NEW"
-            )
-            attributes = response.get('Attributes', None)
-            return {k: deserialize_dynamodb_item(v) for k, v in attributes.items()} if attributes else {}
+        client = await dynamodb_client()
+        # Construct the update expression
+        update_expression, expression_attribute_values = prepare_update(updates, EXPENSE_ATTR_TYPES)
+        response = await client.update_item(
+            TableName='Expenses',
+            Key={'expenseID': {'S': expense_id}, 'date': {'S': date}},
+            UpdateExpression=update_expression,
+            ExpressionAttributeValues=expression_attribute_values,
+            ReturnValues="UPDATED_NEW"
+        )
+        invalidate_cached_item('Expenses', {'expenseID': {'S': expense_id}, 'date': {'S': date}})
+        attributes = response.get('Attributes', None)
+        return {k: deserialize_dynamodb_item(v) for k, v in attributes.items()} if attributes else {}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -396,14 +545,18 @@ async def update_expense(expense_id: str, date: str, request: UpdateStaffRequest
 @app.delete("/jta/api/expense/{expense_id}/{date}", response_model=dict, tags=["Deletes expense for a particular date"])
 async def delete_expense(expense_id: str, date: str, token: str = Depends(verify_token)):
     try:
-        async with session.client('dynamodb') as client:
-            await client.delete_item(TableName='Expenses', Key={'expenseID': {'S': expense_id}, 'date': {'S': date}})
+        client = await dynamodb_client()
+        await client.delete_item(TableName='Expenses', Key={'expenseID': {'S': expense_id}, 'date': {'S': date}})
+        invalidate_cached_item('Expenses', {'expenseID': {'S': expense_id}, 'date': {'S': date}})
         return {"message": "Expense deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # -----------------------------------------------------------------------------------------------------------
 
+# AWS Lambda entry point. Mangum runs lifespan events on every invocation, so
+# they are turned off and the DynamoDB client is opened lazily instead.
+handler = Mangum(app, lifespan="off")
 
 if __name__ == "__main__":
     import uvicorn